@@ -1,7 +1,36 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+import argparse
+import asyncio
+import contextvars
 import functools
+import importlib
+import inspect
+import json
+import random
+import sys
+import threading
+import timeit
+import types
+import weakref
+from bisect import bisect_left
+from collections import deque
 from functools import wraps
+from time import perf_counter
+
+
+def _is_async(func):
+    """True for `async def` functions and for objects with `async def __call__`."""
+    return (inspect.iscoroutinefunction(func)
+            or inspect.iscoroutinefunction(getattr(func, "__call__", None)))
+
+
+def _callable_name(func):
+    """Qualified name of a function, repr() for callables without one (e.g. partial)."""
+    name = getattr(func, "__qualname__", None)
+    if name is None:
+        name = repr(getattr(func, "__wrapped__", func))
+    return name
 
 
 def disable(func):
@@ -12,8 +41,15 @@ def disable(func):
     # >>> memo = disable
 
     """
+    if _is_async(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            return await func(*args, **kwargs)
+        return async_wrapper
+
+    @wraps(func)
     def wrapper(*args, **kwargs):
-        func(*args, **kwargs)
+        return func(*args, **kwargs)
     return wrapper
 
 
@@ -28,23 +64,268 @@ def decorator(func):
     return wrapper
 
 
+# upper bounds of latency histogram buckets in seconds, the last bucket is +Inf
+LATENCY_BUCKETS = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0, 10.0)
+
+
+class _ThreadCounter:
+    """Counters of a single thread, only that thread writes to them."""
+    __slots__ = ("calls", "errors", "total_time", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def merge(self, other, sign=1):
+        self.calls += sign * other.calls
+        self.errors += sign * other.errors
+        self.total_time += sign * other.total_time
+        for i, value in enumerate(other.buckets):
+            self.buckets[i] += sign * value
+
+
+class _ThreadHolder:
+    """Lives in a thread-local storage and dies with its thread."""
+    __slots__ = ("__weakref__",)
+
+
+class MetricsRegistry:
+    """
+    Collection of CallMetrics that can be exported as JSON.
+
+    Metrics are referenced weakly, so functions which are gone
+    disappear from the export. Different functions with the same
+    name get the keys "name", "name#2", etc.
+    """
+
+    def __init__(self):
+        self._metrics = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def register(self, metrics):
+        name = f"{metrics.__module__}.{_callable_name(metrics)}"
+        with self._lock:
+            key = name
+            number = 1
+            while self._metrics.get(key, metrics) is not metrics:
+                number += 1
+                key = f"{name}#{number}"
+            self._metrics[key] = metrics
+
+    def snapshot(self):
+        with self._lock:
+            items = list(self._metrics.items())
+        return {name: metrics.snapshot() for name, metrics in items}
+
+    def export_json(self, path=None, indent=2):
+        """Return metrics of all registered functions as JSON, write it to `path` if given."""
+        data = json.dumps(self.snapshot(), indent=indent)
+        if path is not None:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(data)
+        return data
+
+
+registry = MetricsRegistry()
+
+
+class CallMetrics:
+    """
+    Wrapper collecting calls count, exceptions count and latency
+    histogram of the wrapped function.
+
+    Each thread increments its own counters without locking,
+    they are merged when the metrics are read. Counters of finished
+    threads are merged into a common one.
+    """
+
+    def __init__(self, func, registry=None):
+        functools.update_wrapper(self, func)
+        self._local = threading.local()
+        self._counters = set()
+        self._finished = _ThreadCounter()
+        # totals at the last reset(), subtracted on read
+        self._offset = _ThreadCounter()
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _counter(self):
+        try:
+            return self._local.counter
+        except AttributeError:
+            counter = self._local.counter = _ThreadCounter()
+            self._local.holder = _ThreadHolder()
+            with self._lock:
+                self._counters.add(counter)
+            # the finalizer must not keep the metrics alive
+            weakref.finalize(self._local.holder, self._thread_finished,
+                             weakref.ref(self), counter)
+            return counter
+
+    @staticmethod
+    def _thread_finished(metrics_ref, counter):
+        metrics = metrics_ref()
+        if metrics is None:
+            return
+        with metrics._lock:
+            metrics._counters.discard(counter)
+            metrics._finished.merge(counter)
+
+    def __call__(self, *args, **kwargs):
+        counter = self._counter()
+        counter.calls += 1
+        start = perf_counter()
+        try:
+            return self.__wrapped__(*args, **kwargs)
+        except Exception:
+            counter.errors += 1
+            raise
+        finally:
+            self._observe(counter, perf_counter() - start)
+
+    @staticmethod
+    def _observe(counter, elapsed):
+        counter.total_time += elapsed
+        counter.buckets[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return types.MethodType(self, instance)
+
+    def _merged(self):
+        total = _ThreadCounter()
+        with self._lock:
+            total.merge(self._finished)
+            for counter in self._counters:
+                total.merge(counter)
+            total.merge(self._offset, sign=-1)
+        return total
+
+    @property
+    def metrics(self):
+        """The same object, for the symmetry with the coroutine functions wrappers."""
+        return self
+
+    def reset(self):
+        """Start counting from zero, the threads' counters are left untouched."""
+        offset = _ThreadCounter()
+        with self._lock:
+            offset.merge(self._finished)
+            for counter in self._counters:
+                offset.merge(counter)
+            self._offset = offset
+
+    @property
+    def calls(self):
+        return self._merged().calls
+
+    @calls.setter
+    def calls(self, value):
+        # compatibility with the old `func.calls = 0`
+        if value != 0:
+            raise ValueError("calls can only be reset to 0")
+        self.reset()
+
+    @property
+    def errors(self):
+        return self._merged().errors
+
+    @property
+    def total_time(self):
+        return self._merged().total_time
+
+    @property
+    def histogram(self):
+        """Calls count per latency bucket, keyed by the bucket upper bound."""
+        return self._histogram(self._merged())
+
+    @staticmethod
+    def _histogram(counter):
+        bounds = [str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"]
+        return dict(zip(bounds, counter.buckets))
+
+    def snapshot(self):
+        total = self._merged()
+        return {
+            "calls": total.calls,
+            "errors": total.errors,
+            "total_time": total.total_time,
+            "histogram": self._histogram(total),
+        }
+
+
 def countcalls(func):
-    """Decorator that counts calls made to the function decorated."""
+    """
+    Decorator that counts calls made to the function decorated,
+    the exceptions raised and the latency histogram.
+    The function is registered in the module `registry`.
+
+    For coroutine functions an `async def` wrapper is returned,
+    so it is still recognized as a coroutine function; its metrics
+    are available as `func.metrics` (as for the synchronous ones).
+    """
+    metrics = CallMetrics(func, registry=registry)
+    if not _is_async(func):
+        return metrics
+
     @wraps(func)
-    def wrapper(*args, **kwargs):
-        wrapper.calls += 1
-        result = func(*args, **kwargs)
-        return result
-    wrapper.calls = 0
-    return wrapper
+    async def async_wrapper(*args, **kwargs):
+        counter = metrics._counter()
+        counter.calls += 1
+        start = perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except Exception:
+            counter.errors += 1
+            raise
+        finally:
+            metrics._observe(counter, perf_counter() - start)
+    async_wrapper.metrics = metrics
+    return async_wrapper
+
+
+# separates positional and keyword arguments in memo keys
+_KWARGS_MARK = object()
 
 
 def memo(func):
     """
     Memoize a function so that it caches all return values for
     faster future lookups.
+
+    For coroutine functions the awaited results are cached, and
+    concurrent calls with the same arguments share a single in-flight
+    task instead of running the function again. Failed calls are not
+    cached.
     """
     cache = {}
+    if _is_async(func):
+        # tasks can be awaited only in their own event loop
+        in_flight = {}
+
+        def store(key, loop, task):
+            in_flight.pop((loop, key), None)
+            if not task.cancelled() and task.exception() is None:
+                cache[key] = task.result()
+
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            key = args + (_KWARGS_MARK,) + tuple(sorted(kwargs.items())) if kwargs else args
+            if key in cache:
+                return cache[key]
+            loop = asyncio.get_running_loop()
+            task = in_flight.get((loop, key))
+            if task is None:
+                task = loop.create_task(func(*args, **kwargs))
+                in_flight[(loop, key)] = task
+                task.add_done_callback(functools.partial(store, key, loop))
+            # shield: a cancelled caller must not cancel the shared task
+            return await asyncio.shield(task)
+        return async_wrapper
 
     @wraps(func)
     def wrapper(*args, **kwargs):
@@ -56,11 +337,156 @@ def memo(func):
     return wrapper
 
 
-def n_ary(func):
+def _split(size):
+    """Largest power of two less than size, so equal prefixes split into equal blocks."""
+    return 1 << ((size - 1).bit_length() - 1)
+
+
+def _tree_reduce(func, cache_size, leaf_size=512):
+    """
+    Pairwise reduction of a tuple, results of sub-ranges longer than
+    `leaf_size` are cached, so calls sharing a prefix (or any aligned
+    block) reuse them. Short ranges are folded directly: every cache
+    lookup hashes the whole range, small blocks cost more than they save.
+
+    The types of the items are a part of the key, as 1 == 1.0 == True
+    would share an entry otherwise; they are sliced along with the items.
+    """
+    def reduce_block(items, types):
+        if len(items) <= leaf_size:
+            return functools.reduce(func, items)
+        return cached_block(items, types)
+
+    @functools.lru_cache(maxsize=cache_size)
+    def cached_block(items, types):
+        mid = _split(len(items))
+        return func(reduce_block(items[:mid], types[:mid]),
+                    reduce_block(items[mid:], types[mid:]))
+
+    reduce_block.cache_info = cached_block.cache_info
+    reduce_block.cache_clear = cached_block.cache_clear
+    return reduce_block
+
+
+class _ImportableFunction:
+    """
+    Picklable reference to the binary function of n_ary for process pools.
+    Decorated with n_ary, the function is replaced by the wrapper in
+    its module and can't be pickled by name, so the worker imports the
+    wrapper and takes the function from its `_n_ary_func` attribute.
+    """
+
+    def __init__(self, func):
+        self.module = func.__module__
+        self.qualname = func.__qualname__
+        self.func = func
+
+    def __getstate__(self):
+        return {"module": self.module, "qualname": self.qualname, "func": None}
+
+    def __call__(self, a, b):
+        if self.func is None:
+            obj = importlib.import_module(self.module)
+            for name in self.qualname.split("."):
+                obj = getattr(obj, name)
+            self.func = getattr(obj, "_n_ary_func", obj)
+        return self.func(a, b)
+
+
+def _pair_up(items):
+    """Split a level of pairwise reduction into left items, right items and the odd last one."""
+    return items[0:-1:2], items[1::2], items[-1:] if len(items) % 2 else []
+
+
+def _pairwise_reduce(func, items, map_func=map):
+    """Reduce items level by level, each level's pairs are computed by `map_func`."""
+    while len(items) > 1:
+        lefts, rights, rest = _pair_up(items)
+        items = list(map_func(func, lefts, rights)) + rest
+    return items[0]
+
+
+def n_ary(func=None, *, tree=False, pool=None, cache_size=None):
     """
     Given binary function f(x, y), return an n_ary function such
     that f(x, y, z) = f(x, f(y,z)), etc. Also allow f(x) = x.
+    Works with coroutine binary functions too.
+
+    For associative functions use tree=True to reduce arguments
+    pairwise: f(f(x, y), f(z, t)). Results of sub-ranges longer than
+    512 arguments are cached (up to `cache_size` blocks, 128 by default),
+    so long calls sharing arguments reuse the work done. The cache keeps
+    the arguments of the cached blocks alive until they are evicted or
+    `cache_clear()` is called. The lookups hash the arguments, so calls
+    which share nothing are several times slower than the default fold,
+    see n_ary_benchmark(). Calls with unhashable arguments are reduced
+    without the cache.
+
+    For expensive functions pass a concurrent.futures executor as `pool`
+    to compute each level of pairs in parallel (without the cache).
+    With a process pool the binary function has to be defined at
+    a module level (decorated or not), so the workers can import it.
+
+    For coroutine functions tree=True awaits the pairs of each level
+    concurrently with asyncio.gather, there is no cache and no pool.
+    `pool` and `cache_size` without tree=True raise ValueError.
+
+    @n_ary(tree=True)
+    def add(a, b):
+        return a + b
     """
+    if func is None:
+        return functools.partial(n_ary, tree=tree, pool=pool, cache_size=cache_size)
+
+    if not tree and (pool is not None or cache_size is not None):
+        raise ValueError("pool and cache_size are supported only with tree=True")
+
+    if _is_async(func):
+        if pool is not None or cache_size is not None:
+            raise ValueError("pool and cache_size are not supported for coroutine functions")
+        if tree:
+            @wraps(func)
+            async def async_tree_wrapper(*args):
+                if not args:
+                    return None
+                items = list(args)
+                while len(items) > 1:
+                    lefts, rights, rest = _pair_up(items)
+                    items = list(await asyncio.gather(*map(func, lefts, rights))) + rest
+                return items[0]
+            return async_tree_wrapper
+
+        @wraps(func)
+        async def async_wrapper(*args):
+            result = None
+            for n in reversed(args):
+                if result is None:
+                    result = n
+                else:
+                    result = await func(n, result)
+            return result
+        return async_wrapper
+
+    if tree:
+        reduce_block = _tree_reduce(func, 128 if cache_size is None else cache_size)
+        pool_func = _ImportableFunction(func)
+
+        @wraps(func)
+        def tree_wrapper(*args):
+            if not args:
+                return None
+            if pool is not None:
+                return _pairwise_reduce(pool_func, list(args), pool.map)
+            try:
+                hash(args)
+            except TypeError:
+                return _pairwise_reduce(func, list(args))
+            return reduce_block(args, tuple(map(type, args)))
+        tree_wrapper.cache_info = reduce_block.cache_info
+        tree_wrapper.cache_clear = reduce_block.cache_clear
+        tree_wrapper._n_ary_func = func
+        return tree_wrapper
+
     def wrapper(*args):
         result = None
         for n in reversed(args):
@@ -72,9 +498,42 @@ def n_ary(func):
     return wrapper
 
 
-level = 0
-level_forward = True
-level_back = False
+def n_ary_benchmark(size=5000, calls=50, number=3):
+    """
+    Compare the right fold and the tree reduction of n_ary on calls
+    with thousands of arguments, `calls` calls of about `size` numbers:
+    "reuse" - each call extends the arguments of the previous one,
+    so the tree reuses the cached blocks (the best case);
+    "no_reuse" - unrelated random floats, every lookup misses (the worst case).
+    Return the best times in seconds.
+    """
+    def add(a, b):
+        return a + b
+
+    cases = {
+        "reuse": [tuple(range(size + i)) for i in range(calls)],
+        "no_reuse": [tuple(random.random() for _ in range(size)) for _ in range(calls)],
+    }
+
+    def run(n_ary_add, argument_lists):
+        for args in argument_lists:
+            n_ary_add(*args)
+
+    results = {}
+    for case, argument_lists in cases.items():
+        fold = n_ary(add)
+        results[f"{case}_fold"] = min(
+            timeit.repeat(lambda: run(fold, argument_lists), number=1, repeat=number)
+        )
+        times = []
+        for _ in range(number):
+            tree = n_ary(add, tree=True)
+            times.append(timeit.timeit(lambda: run(tree, argument_lists), number=1))
+        results[f"{case}_tree"] = min(times)
+    return results
+
+
+_trace_level = contextvars.ContextVar("trace_level", default=0)
 
 
 def trace(str_trace):
@@ -96,21 +555,42 @@ def trace(str_trace):
     ____ <-- fib(1) == 1
      <-- fib(3) == 3
 
+    The nesting level is kept per thread / per task, so concurrent
+    traces don't mix up their indentation. For hot functions use
+    `profile` instead.
     """
+    arrow_forward = "-->"
+    arrow_back = "<--"
+
     def trace_decorator(func):
+        if _is_async(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                level = _trace_level.get()
+                prefix = f"{str_trace * level}{arrow_forward}"
+                strargs = ", ".join(repr(a) for a in args)
+                print("{} {}({})".format(prefix, func.__name__, strargs))
+                token = _trace_level.set(level + 1)
+                try:
+                    result = await func(*args, **kwargs)
+                finally:
+                    _trace_level.reset(token)
+                prefix = f"{str_trace * level}{arrow_back}"
+                print("{} {}({}) == {}".format(prefix, func.__name__, strargs, result))
+                return result
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            global level
-            global level_forward
-            global level_back
-            arrow_forward = "-->"
-            arrow_back = "<--"
+            level = _trace_level.get()
             prefix = f"{str_trace * level}{arrow_forward}"
             strargs = ", ".join(repr(a) for a in args)
             print("{} {}({})".format(prefix, func.__name__, strargs))
-            level += 1
-            result = func(*args, **kwargs)
-            level -= 1
+            token = _trace_level.set(level + 1)
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                _trace_level.reset(token)
             prefix = f"{str_trace * level}{arrow_back}"
             print("{} {}({}) == {}".format(prefix, func.__name__, strargs, result))
             return result
@@ -118,6 +598,167 @@ def trace(str_trace):
     return trace_decorator
 
 
+_profile_frame = contextvars.ContextVar("profile_frame", default=None)
+
+# indexes in a profiler frame:
+# [function name, parent frame, time spent in profiled callees, id of asyncio task]
+# the task id, not the task, so records don't keep finished tasks and their results alive
+_NAME, _PARENT, _CHILD_TIME, _TASK = range(4)
+
+
+def _frame_path(frame):
+    """Function names from the outermost frame to `frame`."""
+    path = []
+    while frame is not None:
+        path.append(frame[_NAME])
+        frame = frame[_PARENT]
+    path.reverse()
+    return path
+
+
+class Profiler:
+    """
+    Low-overhead call profiler.
+
+    Every call of a decorated function appends one record
+    (frame, elapsed time) to a ring buffer of `maxlen` entries.
+    A frame links to the frame of its caller and keeps the time spent
+    in profiled callees. The current frame lives in a context variable,
+    so each thread (and each asyncio task) sees its own nesting.
+    Call paths are rebuilt and aggregated only when the results are
+    requested:
+
+    @profile
+    def fib(n):
+        ....
+
+    >>> fib(20)
+    >>> profile.print_stats()
+    >>> profile.dump_folded("fib.folded")  # for flamegraph.pl
+
+    Coroutine functions are timed by wall clock including awaiting.
+    Callees running in other tasks (asyncio.gather, create_task) are
+    not subtracted from the caller's self time, as they overlap.
+    """
+    sort_keys = ("calls", "cumtime", "selftime", "depth", "name")
+
+    def __init__(self, maxlen=100000):
+        self.records = deque(maxlen=maxlen)
+
+    def __call__(self, func):
+        name = _callable_name(func)
+        records = self.records
+        frame_var = _profile_frame
+
+        if _is_async(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                parent = frame_var.get()
+                task = id(asyncio.current_task())
+                frame = [name, parent, 0.0, task]
+                token = frame_var.set(frame)
+                start = perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    elapsed = perf_counter() - start
+                    frame_var.reset(token)
+                    if parent is not None and parent[_TASK] == task:
+                        parent[_CHILD_TIME] += elapsed
+                    records.append((frame, elapsed))
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            parent = frame_var.get()
+            frame = [name, parent, 0.0, parent[_TASK] if parent is not None else None]
+            token = frame_var.set(frame)
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                frame_var.reset(token)
+                if parent is not None:
+                    parent[_CHILD_TIME] += elapsed
+                records.append((frame, elapsed))
+        return wrapper
+
+    def clear(self):
+        self.records.clear()
+
+    def stats(self):
+        """
+        Aggregate the ring buffer into {name: {calls, cumtime, selftime, depth}}.
+        Cumulative time of a recursive function is counted only for its
+        outermost call, depth is the maximal recursion depth seen.
+        Self time is clamped at zero.
+        """
+        result = {}
+        for frame, elapsed in list(self.records):
+            name = frame[_NAME]
+            recursion = _frame_path(frame).count(name)
+            item = result.get(name)
+            if item is None:
+                item = result[name] = {
+                    "calls": 0, "cumtime": 0.0, "selftime": 0.0, "depth": 0
+                }
+            item["calls"] += 1
+            item["selftime"] += max(elapsed - frame[_CHILD_TIME], 0.0)
+            if recursion == 1:
+                item["cumtime"] += elapsed
+            if recursion > item["depth"]:
+                item["depth"] = recursion
+        return result
+
+    def print_stats(self, sort="cumtime", file=None):
+        """Print aggregated stats as a table sorted by `sort` (descending)."""
+        if sort not in self.sort_keys:
+            raise ValueError(f"sort must be one of {self.sort_keys}")
+        rows = [dict(item, name=name) for name, item in self.stats().items()]
+        rows.sort(key=lambda row: row[sort], reverse=sort != "name")
+        file = file or sys.stdout
+        print("{:>10} {:>12} {:>12} {:>6}  {}".format(
+            "calls", "cumtime", "selftime", "depth", "function"), file=file)
+        for row in rows:
+            print("{calls:>10} {cumtime:>12.6f} {selftime:>12.6f} "
+                  "{depth:>6}  {name}".format(**row), file=file)
+
+    def folded(self):
+        """
+        Return stacks in the folded format understood by flamegraph.pl
+        and speedscope: "outer;inner <self time in microseconds>".
+        """
+        totals = {}
+        for frame, elapsed in list(self.records):
+            path = ";".join(_frame_path(frame))
+            totals[path] = totals.get(path, 0.0) + max(elapsed - frame[_CHILD_TIME], 0.0)
+        return [f"{path} {round(value * 1e6)}" for path, value in sorted(totals.items())]
+
+    def dump_folded(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for line in self.folded():
+                f.write(line + "\n")
+
+
+profile = Profiler()
+
+
+def profile_overhead(number=100000):
+    """
+    Benchmark the profiler: return the ratio of the time of a profiled
+    call to the time of a bare call of the same trivial function.
+    """
+    def bare(x):
+        return x
+
+    profiler = Profiler(maxlen=number)
+    profiled = profiler(bare)
+    bare_time = min(timeit.repeat(lambda: bare(1), number=number, repeat=3))
+    profiled_time = min(timeit.repeat(lambda: profiled(1), number=number, repeat=3))
+    return profiled_time / bare_time
+
+
 @countcalls
 @memo
 @n_ary
@@ -133,7 +774,7 @@ def bar(a, b):
 
 
 @countcalls
-@trace("____")
+@profile
 @memo
 def fib(n):
     """Some doc"""
@@ -154,7 +795,23 @@ def main():
     print(fib.__doc__)
     print(fib(3))
     print(fib.calls, 'calls made')
+    profile.print_stats()
+    print(registry.export_json())
+
+
+def benchmark():
+    print(f"profile overhead: x{profile_overhead():.1f} of a bare call")
+    print("n_ary on long calls:", n_ary_benchmark())
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description='Decorators demo')
+    parser.add_argument(
+        '-b', '--benchmark',
+        action='store_true',
+        help='Run the profiler and n_ary benchmarks instead of the demo'
+    )
+    if parser.parse_args().benchmark:
+        benchmark()
+    else:
+        main()
@@ -0,0 +1,503 @@
+import asyncio
+import concurrent.futures
+import contextlib
+import functools
+import gc
+import inspect
+import io
+import json
+import os
+import tempfile
+import threading
+import unittest
+from decimal import Decimal
+
+import deco
+
+
+# decorated at a module level, so the workers have to import the binary function
+_process_pool = concurrent.futures.ProcessPoolExecutor(max_workers=2)
+
+
+@deco.n_ary(tree=True, pool=_process_pool)
+def process_mul(a, b):
+    return a * b
+
+
+def tearDownModule():
+    _process_pool.shutdown()
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.profiler = deco.Profiler()
+
+        @self.profiler
+        def fib(n):
+            return 1 if n <= 1 else fib(n - 1) + fib(n - 2)
+
+        @self.profiler
+        def outer(n):
+            return fib(n)
+
+        self.fib = fib
+        self.outer = outer
+
+    def test_stats(self):
+        self.assertEqual(self.outer(4), 5)
+        stats = self.profiler.stats()
+        fib_name = self.fib.__qualname__
+        outer_name = self.outer.__qualname__
+        self.assertEqual(stats[outer_name]["calls"], 1)
+        self.assertEqual(stats[fib_name]["calls"], 9)
+        self.assertEqual(stats[fib_name]["depth"], 4)
+        self.assertEqual(stats[outer_name]["depth"], 1)
+        self.assertLessEqual(stats[fib_name]["cumtime"], stats[outer_name]["cumtime"])
+        self.assertLessEqual(stats[outer_name]["selftime"], stats[outer_name]["cumtime"])
+
+    def test_deep_recursion(self):
+        @self.profiler
+        def countdown(n):
+            return 0 if n == 0 else countdown(n - 1)
+
+        countdown(199)
+        stats = self.profiler.stats()[countdown.__qualname__]
+        self.assertEqual(stats["calls"], 200)
+        self.assertEqual(stats["depth"], 200)
+        deepest = self.profiler.records[0][0]
+        self.assertIs(deepest[1], self.profiler.records[1][0])
+
+    def test_partial(self):
+        partial_max = self.profiler(functools.partial(max, 1))
+        self.assertEqual(partial_max(5), 5)
+        self.assertEqual(len(self.profiler.stats()), 1)
+
+    def test_ring_buffer(self):
+        profiler = deco.Profiler(maxlen=3)
+        func = profiler(lambda: None)
+        for _ in range(10):
+            func()
+        self.assertEqual(len(profiler.records), 3)
+
+    def test_threads_have_own_stack(self):
+        barrier = threading.Barrier(2)
+
+        @self.profiler
+        def worker():
+            barrier.wait()
+
+        threads = [threading.Thread(target=worker) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.profiler.stats()[worker.__qualname__]["depth"], 1)
+
+    def test_print_stats(self):
+        self.fib(3)
+        output = io.StringIO()
+        self.profiler.print_stats(sort="calls", file=output)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn(self.fib.__qualname__, lines[1])
+        with self.assertRaises(ValueError):
+            self.profiler.print_stats(sort="unknown")
+
+    def test_dump_folded(self):
+        self.outer(2)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "profile.folded")
+            self.profiler.dump_folded(path)
+            with open(path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        outer_name = self.outer.__qualname__
+        fib_name = self.fib.__qualname__
+        stacks = {line.rsplit(" ", 1)[0] for line in lines}
+        self.assertEqual(stacks, {
+            outer_name,
+            f"{outer_name};{fib_name}",
+            f"{outer_name};{fib_name};{fib_name}",
+        })
+
+    @unittest.skipUnless(os.environ.get("DECO_BENCHMARK"), "set DECO_BENCHMARK=1 to run")
+    def test_overhead(self):
+        self.assertLess(deco.profile_overhead(number=20000), 30)
+
+
+class TestCountCalls(unittest.TestCase):
+    def setUp(self):
+        self.registry = deco.MetricsRegistry()
+
+        def div(a, b):
+            """Divide a by b"""
+            return a / b
+
+        self.div = deco.CallMetrics(div, registry=self.registry)
+
+    def test_wraps(self):
+        self.assertEqual(self.div.__name__, "div")
+        self.assertEqual(self.div.__doc__, "Divide a by b")
+        self.assertEqual(self.div(6, 3), 2)
+
+    def test_counts_and_errors(self):
+        self.div(1, 1)
+        with self.assertRaises(ZeroDivisionError):
+            self.div(1, 0)
+        self.assertEqual(self.div.calls, 2)
+        self.assertEqual(self.div.errors, 1)
+        self.assertEqual(sum(self.div.histogram.values()), 2)
+
+    def test_threads(self):
+        def worker():
+            for _ in range(1000):
+                self.div(1, 1)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.div.calls, 8000)
+
+    def test_reset(self):
+        self.div(1, 1)
+        with self.assertRaises(ZeroDivisionError):
+            self.div(1, 0)
+        self.div.calls = 0
+        self.assertEqual(self.div.snapshot()["calls"], 0)
+        self.assertEqual(self.div.errors, 0)
+        self.assertEqual(sum(self.div.histogram.values()), 0)
+        self.div(1, 1)
+        self.assertEqual(self.div.calls, 1)
+        with self.assertRaises(ValueError):
+            self.div.calls = 5
+
+    def test_interrupts_are_not_errors(self):
+        def interrupt():
+            raise KeyboardInterrupt
+
+        metrics = deco.CallMetrics(interrupt)
+        with self.assertRaises(KeyboardInterrupt):
+            metrics()
+        self.assertEqual(metrics.calls, 1)
+        self.assertEqual(metrics.errors, 0)
+        self.assertEqual(sum(metrics.histogram.values()), 1)
+
+    def test_finished_threads_are_merged(self):
+        for _ in range(20):
+            thread = threading.Thread(target=self.div, args=(1, 1))
+            thread.start()
+            thread.join()
+        gc.collect()
+        self.assertEqual(self.div.calls, 20)
+        self.assertLessEqual(len(self.div._counters), 1)
+
+    def test_partial(self):
+        first = deco.countcalls(functools.partial(max, 1))
+        self.assertEqual(first(5), 5)
+        self.assertEqual(first.calls, 1)
+
+    def test_registry_keys_are_unique(self):
+        def make():
+            def f():
+                pass
+            return deco.CallMetrics(f, registry=self.registry)
+
+        first, second = make(), make()
+        first()
+        second()
+        data = self.registry.snapshot()
+        self.assertEqual(len([name for name in data if "make.<locals>.f" in name]), 2)
+
+    def test_registry_is_weak(self):
+        def f():
+            pass
+
+        metrics = deco.CallMetrics(f, registry=self.registry)
+        metrics()
+        del metrics
+        gc.collect()
+        self.assertNotIn(f"{__name__}.{f.__qualname__}", self.registry.snapshot())
+
+    def test_export_json(self):
+        self.div(1, 1)
+        data = json.loads(self.registry.export_json())
+        self.assertEqual(data[f"{__name__}.{self.div.__qualname__}"]["calls"], 1)
+
+    def test_method(self):
+        class Number:
+            def __init__(self, value):
+                self.value = value
+
+            @deco.countcalls
+            def double(self):
+                return self.value * 2
+
+        self.assertEqual(Number(2).double(), 4)
+        self.assertEqual(Number.double.calls, 1)
+
+    def test_disable(self):
+        def add(a, b):
+            """Add a and b"""
+            return a + b
+
+        disabled = deco.disable(add)
+        self.assertEqual(disabled(1, 2), 3)
+        self.assertEqual(disabled.__doc__, "Add a and b")
+
+
+class TestNAry(unittest.TestCase):
+    def test_fold(self):
+        concat = deco.n_ary(lambda a, b: a + b)
+        self.assertEqual(concat("a", "b", "c"), "abc")
+        self.assertEqual(concat("a"), "a")
+        self.assertIsNone(concat())
+
+    def test_tree_matches_fold(self):
+        fold = deco.n_ary(lambda a, b: a + b)
+        tree = deco.n_ary(lambda a, b: a + b, tree=True)
+        for size in (1, 2, 3, 33, 64, 1000, 1025):
+            args = tuple(str(i) for i in range(size))
+            self.assertEqual(tree(*args), fold(*args))
+        self.assertIsNone(tree())
+
+    def test_tree_reuses_blocks(self):
+        calls = []
+
+        @deco.n_ary(tree=True)
+        def add(a, b):
+            calls.append((a, b))
+            return a + b
+
+        self.assertEqual(add(*range(3000)), sum(range(3000)))
+        first = len(calls)
+        self.assertEqual(add(*range(3001)), sum(range(3001)))
+        self.assertLess(len(calls) - first, first / 3)
+        self.assertGreater(add.cache_info().hits, 0)
+
+    def test_tree_cache_is_typed(self):
+        add = deco.n_ary(lambda a, b: a + b, tree=True)
+        self.assertIsInstance(add(*range(1000)), int)
+        result = add(*[float(i) for i in range(1000)])
+        self.assertIsInstance(result, float)
+        self.assertEqual(result, sum(range(1000)))
+        result = add(*[Decimal(i) for i in range(1000)])
+        self.assertIsInstance(result, Decimal)
+
+    def test_process_pool(self):
+        self.assertEqual(process_mul(*range(1, 11)), 3628800)
+        self.assertEqual(process_mul(7), 7)
+
+    def test_pool(self):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as pool:
+            mul = deco.n_ary(lambda a, b: a * b, tree=True, pool=pool)
+            self.assertEqual(mul(*range(1, 11)), 3628800)
+            self.assertEqual(mul(5), 5)
+
+    def test_tree_unhashable(self):
+        concat = deco.n_ary(lambda a, b: a + b, tree=True)
+        for size in (3, 33, 100):
+            args = [[i] for i in range(size)]
+            self.assertEqual(concat(*args), list(range(size)))
+
+    def test_unsupported_options(self):
+        async def add(a, b):
+            return a + b
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+            with self.assertRaises(ValueError):
+                deco.n_ary(lambda a, b: a + b, pool=pool)
+            with self.assertRaises(ValueError):
+                deco.n_ary(add, tree=True, pool=pool)
+        with self.assertRaises(ValueError):
+            deco.n_ary(lambda a, b: a + b, cache_size=10)
+        with self.assertRaises(ValueError):
+            deco.n_ary(add, tree=True, cache_size=10)
+
+    def test_async_tree(self):
+        @deco.n_ary(tree=True)
+        async def add(a, b):
+            return a + b
+
+        self.assertEqual(asyncio.run(add(*range(100))), sum(range(100)))
+        self.assertEqual(asyncio.run(add(*"abcde")), "abcde")
+
+    def test_benchmark(self):
+        results = deco.n_ary_benchmark(size=600, calls=3, number=1)
+        self.assertEqual(set(results), {
+            "reuse_fold", "reuse_tree", "no_reuse_fold", "no_reuse_tree"
+        })
+
+
+class TestAsyncDecorators(unittest.TestCase):
+    def test_memo_caches_result(self):
+        calls = []
+
+        @deco.memo
+        async def square(x):
+            calls.append(x)
+            return x * x
+
+        async def run():
+            return [await square(3), await square(3)]
+
+        self.assertTrue(inspect.iscoroutinefunction(square))
+        self.assertEqual(asyncio.run(run()), [9, 9])
+        self.assertEqual(calls, [3])
+
+    def test_memo_single_flight(self):
+        calls = []
+
+        @deco.memo
+        async def slow(x):
+            calls.append(x)
+            await asyncio.sleep(0.01)
+            return x
+
+        async def run():
+            return await asyncio.gather(*(slow(1) for _ in range(10)))
+
+        self.assertEqual(asyncio.run(run()), [1] * 10)
+        self.assertEqual(calls, [1])
+
+    def test_memo_does_not_cache_errors(self):
+        calls = []
+
+        @deco.memo
+        async def fail(x):
+            calls.append(x)
+            raise ValueError(x)
+
+        async def run():
+            for _ in range(2):
+                with self.assertRaises(ValueError):
+                    await fail(1)
+
+        asyncio.run(run())
+        self.assertEqual(calls, [1, 1])
+
+    def test_memo_kwargs(self):
+        @deco.memo
+        async def scaled(x, scale=1):
+            await asyncio.sleep(0)
+            return x * scale
+
+        async def run():
+            return await asyncio.gather(scaled(2, scale=1), scaled(2, scale=10), scaled(2))
+
+        self.assertEqual(asyncio.run(run()), [2, 20, 2])
+
+    def test_memo_event_loops_in_threads(self):
+        barrier = threading.Barrier(2)
+        results = []
+
+        @deco.memo
+        async def slow(x):
+            await asyncio.sleep(0.05)
+            return x
+
+        async def run():
+            task = asyncio.ensure_future(slow(1))
+            await asyncio.sleep(0)
+            barrier.wait()
+            return await task
+
+        def worker():
+            results.append(asyncio.run(run()))
+
+        threads = [threading.Thread(target=worker) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [1, 1])
+
+    def test_countcalls(self):
+        @deco.countcalls
+        async def echo(x):
+            return x
+
+        async def run():
+            return await asyncio.gather(echo(1), echo(2))
+
+        self.assertTrue(inspect.iscoroutinefunction(echo))
+        self.assertEqual(asyncio.run(run()), [1, 2])
+        self.assertEqual(echo.metrics.calls, 2)
+        self.assertEqual(echo.__name__, "echo")
+
+    def test_countcalls_cancelled(self):
+        @deco.countcalls
+        async def wait():
+            await asyncio.sleep(10)
+
+        async def run():
+            task = asyncio.ensure_future(wait())
+            await asyncio.sleep(0)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+        self.assertEqual(wait.metrics.calls, 1)
+        self.assertEqual(wait.metrics.errors, 0)
+
+    def test_n_ary(self):
+        @deco.n_ary
+        async def add(a, b):
+            return a + b
+
+        self.assertEqual(asyncio.run(add(1, 2, 3)), 6)
+        self.assertEqual(asyncio.run(add(1)), 1)
+
+    def test_trace(self):
+        @deco.trace("__")
+        async def fib(n):
+            return 1 if n <= 1 else await fib(n - 1) + await fib(n - 2)
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertEqual(asyncio.run(fib(2)), 2)
+        self.assertEqual(output.getvalue().splitlines(), [
+            "--> fib(2)",
+            "__--> fib(1)",
+            "__<-- fib(1) == 1",
+            "__--> fib(0)",
+            "__<-- fib(0) == 1",
+            "<-- fib(2) == 2",
+        ])
+
+    def test_profile(self):
+        profiler = deco.Profiler()
+
+        @profiler
+        async def nap():
+            await asyncio.sleep(0)
+
+        asyncio.run(nap())
+        self.assertEqual(profiler.stats()[nap.__qualname__]["calls"], 1)
+
+    def test_profile_gather(self):
+        profiler = deco.Profiler()
+
+        @profiler
+        async def child():
+            await asyncio.sleep(0.01)
+
+        @profiler
+        async def parent():
+            await asyncio.gather(*(child() for _ in range(5)))
+            await child()
+
+        asyncio.run(parent())
+        gc.collect()
+        self.assertFalse(any(isinstance(obj, asyncio.Task) for obj in gc.get_referents(
+            *(frame for frame, _ in profiler.records))))
+        stats = profiler.stats()[parent.__qualname__]
+        self.assertGreaterEqual(stats["selftime"], 0.005)
+        self.assertLess(stats["selftime"], stats["cumtime"])
+        for line in profiler.folded():
+            self.assertGreaterEqual(int(line.rsplit(" ", 1)[1]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()